@@ -1 +1,74 @@
+# db/__init__.py
+# Backend выбирается один раз при импорте — внутри модулей pg/sqlite
+# прямолинейный SQL без ветвления if DATABASE_URL на каждый запрос
+import os
+import asyncio
 
+if os.getenv("DATABASE_URL"):
+    from db import pg as _backend
+    from db.pg import (
+        db_conn,
+        init_db,
+        add_user,
+        get_user_id,
+        add_transaction,
+        bulk_add_transactions,
+        get_full_report,
+        generate_excel_report_bytes,
+    )
+else:
+    from db import sqlite as _backend
+    from db.sqlite import (
+        db_conn,
+        init_db,
+        add_user,
+        get_user_id,
+        add_transaction,
+        bulk_add_transactions,
+        get_full_report,
+        generate_excel_report_bytes,
+    )
+
+# === ОЧЕРЕДЬ ЗАПИСИ ===
+
+# Один писатель снимает конкуренцию за блокировку записи (SQLite
+# сериализует писателей) и позволяет группировать накопившиеся вставки
+# в одну транзакцию — один fsync на пакет вместо одного на сообщение
+_write_queue = None
+_BATCH_MAX = 50       # максимум вставок в одной транзакции
+_BATCH_WINDOW = 0.02  # сколько ждать попутчиков, сек
+
+def start_writer():
+    """Запускает фоновую задачу-писатель; вызывать из работающего event loop"""
+    global _write_queue
+    _write_queue = asyncio.Queue()
+    return asyncio.create_task(_writer_loop())
+
+async def add_transaction_async(tg_user_id: int, trans_type: str, amount: float, category: str, description: str = ""):
+    """Ставит операцию в очередь писателя и ждёт подтверждения записи"""
+    if _write_queue is None:
+        # Писатель не запущен (например, в тестах) — пишем напрямую
+        await asyncio.to_thread(add_transaction, tg_user_id, trans_type, amount, category, description)
+        return
+    future = asyncio.get_running_loop().create_future()
+    await _write_queue.put(((tg_user_id, trans_type, amount, category, description), future))
+    await future
+
+async def _writer_loop():
+    while True:
+        jobs = [await _write_queue.get()]
+        try:
+            while len(jobs) < _BATCH_MAX:
+                jobs.append(await asyncio.wait_for(_write_queue.get(), timeout=_BATCH_WINDOW))
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await asyncio.to_thread(_backend._flush_writes, [args for args, _ in jobs])
+        except Exception as e:
+            for _, future in jobs:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in jobs:
+                if not future.done():
+                    future.set_result(None)
@@ -0,0 +1,278 @@
+# db/pg.py — backend PostgreSQL (используется при заданном DATABASE_URL)
+import os
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extras import RealDictCursor, execute_values
+from datetime import datetime, timedelta, time
+
+# Получаем URL базы из переменных окружения (Railway задаёт автоматически)
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# NUMERIC по умолчанию приходит как Decimal; регистрируем typecaster,
+# чтобы libpq отдавал float сразу при материализации строки — без
+# поштучных float(...) в циклах отчётов
+_DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, "DEC2FLOAT",
+    lambda value, cur: float(value) if value is not None else None
+)
+psycopg2.extensions.register_type(_DEC2FLOAT)
+
+# Пул соединений: подключаться на каждое сообщение дорого —
+# TCP+TLS+аутентификация на каждый запрос
+_pg_pool = None
+
+@contextmanager
+def db_conn():
+    """Выдаёт соединение из пула; соединение возвращается, а не закрывается"""
+    global _pg_pool
+    if _pg_pool is None:
+        _pg_pool = pool.ThreadedConnectionPool(
+            1, 10, DATABASE_URL, cursor_factory=RealDictCursor
+        )
+    conn = _pg_pool.getconn()
+    try:
+        yield conn
+    finally:
+        _pg_pool.putconn(conn)
+
+def init_db():
+    """Создаёт таблицы и индексы"""
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                tg_user_id BIGINT UNIQUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id),
+                type VARCHAR(10),
+                amount NUMERIC,
+                category VARCHAR(50),
+                description TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Все отчётные запросы фильтруют по user_id + дате/типу; без
+        # индексов каждый отчёт — полный скан, растущий с историей
+        cur.execute("CREATE INDEX IF NOT EXISTS ix_tx_user_date ON transactions(user_id, created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS ix_tx_user_type_cat ON transactions(user_id, type, category)")
+        # Частичный индекс под разбивку расходов по категориям
+        cur.execute("CREATE INDEX IF NOT EXISTS ix_tx_user_expense ON transactions(user_id, category) WHERE type = 'expense'")
+        conn.commit()
+
+def add_user(tg_user_id: int):
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO users (tg_user_id) VALUES (%s) ON CONFLICT (tg_user_id) DO NOTHING",
+            (tg_user_id,)
+        )
+        conn.commit()
+
+# Связка tg_user_id -> внутренний id неизменна после создания пользователя,
+# поэтому кэшируем её навсегда: для известных пользователей SELECT не нужен
+_user_id_cache: dict[int, int] = {}
+
+# SQL горячих путей — модульные константы: подготовить один раз,
+# выполнять много раз с одинаковым текстом запроса
+_SQL_GET_USER = "SELECT id FROM users WHERE tg_user_id = %s"
+
+_SQL_ADD_TX = """
+    WITH u AS (
+        INSERT INTO users (tg_user_id)
+        VALUES (%s)
+        ON CONFLICT (tg_user_id) DO NOTHING
+        RETURNING id
+    )
+    INSERT INTO transactions (user_id, type, amount, category, description)
+    SELECT COALESCE(
+        (SELECT id FROM u),
+        (SELECT id FROM users WHERE tg_user_id = %s)
+    ), %s, %s, %s, %s
+"""
+
+def get_user_id(tg_user_id: int):
+    user_id = _user_id_cache.get(tg_user_id)
+    if user_id is not None:
+        return user_id
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(_SQL_GET_USER, (tg_user_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        _user_id_cache[tg_user_id] = row["id"]
+        return row["id"]
+
+def add_transaction(tg_user_id: int, trans_type: str, amount: float, category: str, description: str = ""):
+    """Создаёт пользователя (если нужно) и записывает операцию одной транзакцией.
+
+    Upsert пользователя и вставка операции — один CTE-запрос, один
+    сетевой round-trip; created_at проставляет сама база.
+    """
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(_SQL_ADD_TX,
+                    (tg_user_id, tg_user_id, trans_type, amount, category, description))
+        conn.commit()
+
+def _flush_writes(batch):
+    """Пишет пакет операций одной транзакцией (вызывается из потока писателя)"""
+    with db_conn() as conn:
+        cur = conn.cursor()
+        for tg_user_id, trans_type, amount, category, description in batch:
+            cur.execute(_SQL_ADD_TX,
+                        (tg_user_id, tg_user_id, trans_type, amount, category, description))
+        conn.commit()
+
+def bulk_add_transactions(user_id: int, rows):
+    """Массовая вставка операций (например, импорт из CSV).
+
+    rows — последовательность кортежей (type, amount, category,
+    description, created_at). Все строки пишутся одной транзакцией:
+    parse/plan и commit амортизируются на весь пакет, а не на строку.
+    """
+    params = [(user_id,) + tuple(row) for row in rows]
+    if not params:
+        return
+    with db_conn() as conn:
+        cur = conn.cursor()
+        execute_values(cur, """
+            INSERT INTO transactions (user_id, type, amount, category, description, created_at)
+            VALUES %s
+        """, params, page_size=500)
+        conn.commit()
+
+# === ФУНКЦИИ ОТЧЁТОВ ===
+
+def get_full_report(user_id: int):
+    """Собирает отчёт за день/неделю/месяц и разбивку расходов по категориям.
+
+    Вместо четырёх отдельных запросов — один проход по срезу пользователя
+    с условной агрегацией плюс один маленький запрос по категориям.
+    Возвращает (daily, weekly, monthly, cat_expenses), где каждый период —
+    кортеж (доход, расход, прибыль).
+    """
+    now = datetime.utcnow()
+    # Полуоткрытые диапазоны вместо ::date на колонке: функция на левой
+    # части предиката отключает индекс по created_at
+    day_start = datetime.combine(now.date(), time.min)
+    day_end = (day_start + timedelta(days=1)).isoformat(sep=" ")
+    week_start = (day_start - timedelta(days=7)).isoformat(sep=" ")
+    day_start = day_start.isoformat(sep=" ")
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat(sep=" ")
+    # Окно запроса — самая ранняя из границ (начало месяца или 7 дней назад)
+    range_start = min(week_start, month_start)
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT
+                COALESCE(SUM(CASE WHEN created_at >= %s AND created_at < %s AND type = 'income' THEN amount ELSE 0 END), 0) AS d_inc,
+                COALESCE(SUM(CASE WHEN created_at >= %s AND created_at < %s AND type = 'expense' THEN amount ELSE 0 END), 0) AS d_exp,
+                COALESCE(SUM(CASE WHEN created_at >= %s AND type = 'income' THEN amount ELSE 0 END), 0) AS w_inc,
+                COALESCE(SUM(CASE WHEN created_at >= %s AND type = 'expense' THEN amount ELSE 0 END), 0) AS w_exp,
+                COALESCE(SUM(CASE WHEN created_at >= %s AND type = 'income' THEN amount ELSE 0 END), 0) AS m_inc,
+                COALESCE(SUM(CASE WHEN created_at >= %s AND type = 'expense' THEN amount ELSE 0 END), 0) AS m_exp
+            FROM transactions
+            WHERE user_id = %s AND created_at >= %s
+        """, (day_start, day_end, day_start, day_end, week_start, week_start, month_start, month_start, user_id, range_start))
+        sums = cur.fetchone()
+        d_inc, d_exp = sums["d_inc"], sums["d_exp"]
+        w_inc, w_exp = sums["w_inc"], sums["w_exp"]
+        m_inc, m_exp = sums["m_inc"], sums["m_exp"]
+
+        cur.execute("""
+            SELECT category, SUM(amount) AS total
+            FROM transactions
+            WHERE user_id = %s AND type = 'expense'
+            GROUP BY category
+            ORDER BY total DESC
+        """, (user_id,))
+        cat_expenses = [(row["category"], row["total"]) for row in cur.fetchall()]
+
+    return (
+        (d_inc, d_exp, d_inc - d_exp),
+        (w_inc, w_exp, w_inc - w_exp),
+        (m_inc, m_exp, m_inc - m_exp),
+        cat_expenses,
+    )
+
+# === EXCEL ГЕНЕРАЦИЯ ===
+
+def generate_excel_report_bytes(user_id: int) -> bytes:
+    """Формирует Excel-отчёт и возвращает его содержимое в памяти —
+    без временного файла на диске"""
+    from io import BytesIO
+    from collections import defaultdict
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    # write_only-книга пишет строки сразу в поток, не держа все ячейки
+    # в памяти; операции читаем курсором-итератором, без fetchall()
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+
+    def header(ws, titles):
+        cells = []
+        for title in titles:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = bold
+            cells.append(cell)
+        ws.append(cells)
+
+    # Сводку считаем за один проход по уже читаемым строкам — отдельные
+    # запросы по категориям и месяцу не нужны
+    now = datetime.utcnow()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    cat_totals = defaultdict(float)
+    m_income = 0.0
+    m_expense = 0.0
+
+    with db_conn() as conn:
+        # Операции — потоково через серверный курсор, порциями по 1000 строк
+        ws1 = wb.create_sheet("Операции")
+        header(ws1, ["Дата и время", "Тип", "Категория", "Сумма", "Комментарий"])
+        stream = conn.cursor(name="stream_tx")
+        stream.itersize = 1000
+        stream.execute("""
+            SELECT created_at, type, category, amount, description
+            FROM transactions
+            WHERE user_id = %s
+            ORDER BY created_at
+        """, (user_id,))
+        for row in stream:
+            created_at = row["created_at"]
+            amount = row["amount"]
+            dt = str(created_at).split(".")[0]
+            ws1.append([dt, row["type"], row["category"], amount, row["description"]])
+            if row["type"] == "expense":
+                cat_totals[row["category"]] += amount
+            if created_at >= month_start:
+                if row["type"] == "income":
+                    m_income += amount
+                else:
+                    m_expense += amount
+        stream.close()
+
+    ws2 = wb.create_sheet("Сводка")
+    header(ws2, ["Категория", "Сумма"])
+    for cat, total in sorted(cat_totals.items(), key=lambda item: item[1], reverse=True):
+        ws2.append([cat, total])
+
+    ws2.append([])
+    ws2.append(["Итого за месяц", ""])
+    ws2.append(["Доход", m_income])
+    ws2.append(["Расход", m_expense])
+    ws2.append(["Прибыль", m_income - m_expense])
+
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
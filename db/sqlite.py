@@ -0,0 +1,264 @@
+# db/sqlite.py — backend SQLite (локальная разработка, без DATABASE_URL)
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, time
+
+# Единственное долгоживущее соединение: повторное открытие файла на каждый
+# запрос выбрасывало бы страничный кэш SQLite
+_sqlite_conn = None
+_sqlite_lock = threading.Lock()
+
+@contextmanager
+def db_conn():
+    """Выдаёт постоянное соединение под локом; оно никогда не закрывается"""
+    global _sqlite_conn
+    with _sqlite_lock:
+        if _sqlite_conn is None:
+            _sqlite_conn = sqlite3.connect("finance.db", check_same_thread=False)
+            _sqlite_conn.row_factory = sqlite3.Row
+            # Настраиваем соединение один раз на всё время его жизни:
+            # WAL пишет журнал последовательно и убирает двойной fsync,
+            # большой кэш держит страницы B-дерева горячими между запросами.
+            _sqlite_conn.execute("PRAGMA journal_mode=WAL")
+            _sqlite_conn.execute("PRAGMA synchronous=NORMAL")
+            _sqlite_conn.execute("PRAGMA temp_store=MEMORY")
+            _sqlite_conn.execute("PRAGMA cache_size=-64000")
+            _sqlite_conn.execute("PRAGMA mmap_size=268435456")
+        yield _sqlite_conn
+
+def init_db():
+    """Создаёт таблицы и индексы"""
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tg_user_id INTEGER UNIQUE,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                type TEXT,
+                amount REAL,
+                category TEXT,
+                description TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            )
+        """)
+        # Все отчётные запросы фильтруют по user_id + дате/типу; без
+        # индексов каждый отчёт — полный скан, растущий с историей
+        cur.execute("CREATE INDEX IF NOT EXISTS ix_tx_user_date ON transactions(user_id, created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS ix_tx_user_type_cat ON transactions(user_id, type, category)")
+        conn.commit()
+
+def add_user(tg_user_id: int):
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT OR IGNORE INTO users (tg_user_id, created_at) VALUES (?, datetime('now'))",
+            (tg_user_id,)
+        )
+        conn.commit()
+
+# Связка tg_user_id -> внутренний id неизменна после создания пользователя,
+# поэтому кэшируем её навсегда: для известных пользователей SELECT не нужен
+_user_id_cache: dict[int, int] = {}
+
+# SQL горячих путей — модульные константы. SQLite кэширует скомпилированные
+# statements по тексту запроса (statement cache в sqlite3), так что одинаковый
+# объект строки означает «подготовить один раз, выполнять много раз».
+_SQL_GET_USER = "SELECT id FROM users WHERE tg_user_id = ?"
+# created_at проставляем в самом INSERT через datetime('now'): DEFAULT
+# CURRENT_TIMESTAMP не появится в transactions, созданной старой версией
+# схемы (CREATE TABLE IF NOT EXISTS не меняет существующую таблицу),
+# и без явного значения такие базы писали бы NULL
+_SQL_UPSERT_USER = "INSERT OR IGNORE INTO users (tg_user_id, created_at) VALUES (?, datetime('now'))"
+_SQL_ADD_TX = """
+    INSERT INTO transactions (user_id, type, amount, category, description, created_at)
+    SELECT id, ?, ?, ?, ?, datetime('now') FROM users WHERE tg_user_id = ?
+"""
+
+def get_user_id(tg_user_id: int):
+    user_id = _user_id_cache.get(tg_user_id)
+    if user_id is not None:
+        return user_id
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(_SQL_GET_USER, (tg_user_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        _user_id_cache[tg_user_id] = row["id"]
+        return row["id"]
+
+def add_transaction(tg_user_id: int, trans_type: str, amount: float, category: str, description: str = ""):
+    """Создаёт пользователя (если нужно) и записывает операцию одной транзакцией.
+
+    Обе вставки — в одной транзакции, один fsync вместо двух;
+    created_at проставляет сама база.
+    """
+    with db_conn() as conn:
+        cur = conn.cursor()
+        with conn:
+            cur.execute(_SQL_UPSERT_USER, (tg_user_id,))
+            cur.execute(_SQL_ADD_TX,
+                        (trans_type, amount, category, description, tg_user_id))
+
+def _flush_writes(batch):
+    """Пишет пакет операций одной транзакцией (вызывается из потока писателя)"""
+    with db_conn() as conn:
+        cur = conn.cursor()
+        with conn:
+            for tg_user_id, trans_type, amount, category, description in batch:
+                cur.execute(_SQL_UPSERT_USER, (tg_user_id,))
+                cur.execute(_SQL_ADD_TX,
+                            (trans_type, amount, category, description, tg_user_id))
+
+def bulk_add_transactions(user_id: int, rows):
+    """Массовая вставка операций (например, импорт из CSV).
+
+    rows — последовательность кортежей (type, amount, category,
+    description, created_at). Все строки пишутся одной транзакцией:
+    parse/plan и commit амортизируются на весь пакет, а не на строку.
+    """
+    params = [(user_id,) + tuple(row) for row in rows]
+    if not params:
+        return
+    with db_conn() as conn:
+        cur = conn.cursor()
+        with conn:
+            cur.executemany("""
+                INSERT INTO transactions (user_id, type, amount, category, description, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, params)
+
+# === ФУНКЦИИ ОТЧЁТОВ ===
+
+def get_full_report(user_id: int):
+    """Собирает отчёт за день/неделю/месяц и разбивку расходов по категориям.
+
+    Вместо четырёх отдельных запросов — один проход по срезу пользователя
+    с условной агрегацией плюс один маленький запрос по категориям.
+    Возвращает (daily, weekly, monthly, cat_expenses), где каждый период —
+    кортеж (доход, расход, прибыль).
+    """
+    now = datetime.utcnow()
+    # Полуоткрытые диапазоны вместо DATE(created_at) на колонке: функция
+    # на левой части предиката отключает индекс по created_at
+    day_start = datetime.combine(now.date(), time.min)
+    day_end = (day_start + timedelta(days=1)).isoformat(sep=" ")
+    week_start = (day_start - timedelta(days=7)).isoformat(sep=" ")
+    day_start = day_start.isoformat(sep=" ")
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat(sep=" ")
+    # Окно запроса — самая ранняя из границ (начало месяца или 7 дней назад)
+    range_start = min(week_start, month_start)
+
+    with db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT
+                COALESCE(SUM(CASE WHEN created_at >= ? AND created_at < ? AND type = 'income' THEN amount ELSE 0 END), 0) AS d_inc,
+                COALESCE(SUM(CASE WHEN created_at >= ? AND created_at < ? AND type = 'expense' THEN amount ELSE 0 END), 0) AS d_exp,
+                COALESCE(SUM(CASE WHEN created_at >= ? AND type = 'income' THEN amount ELSE 0 END), 0) AS w_inc,
+                COALESCE(SUM(CASE WHEN created_at >= ? AND type = 'expense' THEN amount ELSE 0 END), 0) AS w_exp,
+                COALESCE(SUM(CASE WHEN created_at >= ? AND type = 'income' THEN amount ELSE 0 END), 0) AS m_inc,
+                COALESCE(SUM(CASE WHEN created_at >= ? AND type = 'expense' THEN amount ELSE 0 END), 0) AS m_exp
+            FROM transactions
+            WHERE user_id = ? AND created_at >= ?
+        """, (day_start, day_end, day_start, day_end, week_start, week_start, month_start, month_start, user_id, range_start))
+        sums = cur.fetchone()
+        d_inc, d_exp = sums["d_inc"], sums["d_exp"]
+        w_inc, w_exp = sums["w_inc"], sums["w_exp"]
+        m_inc, m_exp = sums["m_inc"], sums["m_exp"]
+
+        cur.execute("""
+            SELECT category, SUM(amount) AS total
+            FROM transactions
+            WHERE user_id = ? AND type = 'expense'
+            GROUP BY category
+            ORDER BY total DESC
+        """, (user_id,))
+        cat_expenses = [(row["category"], row["total"]) for row in cur.fetchall()]
+
+    return (
+        (d_inc, d_exp, d_inc - d_exp),
+        (w_inc, w_exp, w_inc - w_exp),
+        (m_inc, m_exp, m_inc - m_exp),
+        cat_expenses,
+    )
+
+# === EXCEL ГЕНЕРАЦИЯ ===
+
+def generate_excel_report_bytes(user_id: int) -> bytes:
+    """Формирует Excel-отчёт и возвращает его содержимое в памяти —
+    без временного файла на диске"""
+    from io import BytesIO
+    from collections import defaultdict
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    # write_only-книга пишет строки сразу в поток, не держа все ячейки
+    # в памяти; операции читаем курсором-итератором, без fetchall()
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+
+    def header(ws, titles):
+        cells = []
+        for title in titles:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = bold
+            cells.append(cell)
+        ws.append(cells)
+
+    # Сводку считаем за один проход по уже читаемым строкам — отдельные
+    # запросы по категориям и месяцу не нужны
+    now = datetime.utcnow()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat(sep=" ")
+    cat_totals = defaultdict(float)
+    m_income = 0.0
+    m_expense = 0.0
+
+    with db_conn() as conn:
+        # Операции — потоково: sqlite3-курсор и так итератор
+        ws1 = wb.create_sheet("Операции")
+        header(ws1, ["Дата и время", "Тип", "Категория", "Сумма", "Комментарий"])
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT created_at, type, category, amount, description
+            FROM transactions
+            WHERE user_id = ?
+            ORDER BY created_at
+        """, (user_id,))
+        for row in cur:
+            created_at = str(row["created_at"])
+            amount = float(row["amount"])
+            dt = created_at.split(".")[0]
+            ws1.append([dt, row["type"], row["category"], amount, row["description"]])
+            if row["type"] == "expense":
+                cat_totals[row["category"]] += amount
+            if created_at >= month_start:
+                if row["type"] == "income":
+                    m_income += amount
+                else:
+                    m_expense += amount
+
+    ws2 = wb.create_sheet("Сводка")
+    header(ws2, ["Категория", "Сумма"])
+    for cat, total in sorted(cat_totals.items(), key=lambda item: item[1], reverse=True):
+        ws2.append([cat, total])
+
+    ws2.append([])
+    ws2.append(["Итого за месяц", ""])
+    ws2.append(["Доход", m_income])
+    ws2.append(["Расход", m_expense])
+    ws2.append(["Прибыль", m_income - m_expense])
+
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()